@@ -1,52 +1,124 @@
 import asyncio
-import json
 import logging
-from asyncio import sleep
+import os
+import time
+from collections import deque
 from datetime import datetime
-from tkinter import messagebox
 
-import aiofiles
+import orjson
 
-from gui import ReadConnectionStateChanged, SendingConnectionStateChanged, NicknameReceived
-from socket_manager import create_chat_connection
+from gui import ReadConnectionStateChanged, SendingConnectionStateChanged, NicknameReceived, ShowError
+from socket_manager import create_chat_connection, create_raw_connection
 
 logger = logging.getLogger(__name__)
+watchdog_logger = logging.getLogger('watchdog')
 
 
 class InvalidToken(Exception):
     pass
 
 
-def load_chat_history(history_path, messages_queue):
-    try:
-        with open(history_path, 'r') as file:
-            old_messages = file.read()
-        messages_queue.put_nowait(old_messages)
-        logger.debug('Chat history loaded')
-    except FileNotFoundError:
-        logger.debug('Chat history not found')
+class _Liveness:
+    __slots__ = ('timestamp',)
+
+    def __init__(self):
+        self.timestamp = 0.0
+
+
+# Shared last-activity mark (time.monotonic). Bumping it is how the hot
+# paths prove the connection is alive without waking the watchdog task.
+LIVENESS = _Liveness()
+
+
+class TaggedQueue:
+    """Proxy multiplexing a producer onto a shared tagged event queue."""
+
+    __slots__ = ('_queue', '_tag')
+
+    def __init__(self, queue, tag):
+        self._queue = queue
+        self._tag = tag
+
+    def put_nowait(self, payload):
+        self._queue.put_nowait((self._tag, payload))
+
+
+class SpscChannel:
+    """Single-producer single-consumer queue: a deque plus one Event
+    instead of asyncio.Queue's per-get waiter futures."""
+
+    __slots__ = ('_messages', '_has_messages')
+
+    def __init__(self):
+        self._messages = deque()
+        self._has_messages = asyncio.Event()
+
+    def put_nowait(self, message):
+        self._messages.append(message)
+        self._has_messages.set()
+
+    def get_nowait(self):
+        if not self._messages:
+            raise asyncio.QueueEmpty
+        return self._messages.popleft()
+
+    async def get(self):
+        while not self._messages:
+            self._has_messages.clear()
+            await self._has_messages.wait()
+        return self._messages.popleft()
+
+
+_last_stamp_minute = None
+_last_stamp = ''
+
+
+def _get_timestamp():
+    # The stamp has minute resolution, so recompute it only when the
+    # minute changes instead of running strftime for every message.
+    global _last_stamp_minute, _last_stamp
+    now = time.time()
+    minute = int(now // 60)
+    if minute != _last_stamp_minute:
+        _last_stamp = datetime.fromtimestamp(now).strftime('%d.%m.%y %H:%M')
+        _last_stamp_minute = minute
+    return _last_stamp
+
 
+def post_watchdog(watchdog_queue, event):
+    # The liveness reset is a plain timestamp write; the queued event
+    # only feeds the watchdog log line, so skip the queue entirely when
+    # INFO is filtered out.
+    LIVENESS.timestamp = time.monotonic()
+    if watchdog_logger.isEnabledFor(logging.INFO):
+        watchdog_queue.put_nowait(event)
 
-async def handle_chat_reply(reader, watchdog_queue, purpose):
-    raw_message = await reader.readline()
-    decoded_message = raw_message.decode()
-    watchdog_queue.put_nowait(f'Message sent. {purpose}')
-    return decoded_message
 
+def _encode_message(message):
+    # replace() always allocates a new string, so scan first: the GUI
+    # practically never produces a literal backslash-n.
+    if r'\n' in message:
+        message = message.replace(r'\n', ' ')
+    encoded_message = bytearray(message, 'utf-8')
+    encoded_message += b'\n'
+    return encoded_message
 
-async def send_message(writer, message):
-    sanitized_message = message.replace(r"\n", " ")
-    logger.debug(f'Sending message: {sanitized_message}')
-    writer.write(f'{sanitized_message}\n'.encode())
-    await writer.drain()
+
+async def send_message(writer, message, flush=True):
+    logger.debug('Sending message: %s', message)
+    writer.write(_encode_message(message))
+    if flush:
+        await writer.drain()
+
+
+def _read_token_sync(hash_path):
+    with open(hash_path, 'rb') as file:
+        return orjson.loads(file.read())['account_hash']
 
 
 async def get_token(hash_path):
     try:
-        async with aiofiles.open(hash_path, mode='r') as f:
-            contents = await f.read()
-            user_payload = json.loads(contents)
-        return user_payload['account_hash']
+        return await asyncio.to_thread(_read_token_sync, hash_path)
     except FileNotFoundError:
         return
 
@@ -55,12 +127,40 @@ async def authorize_user(reader, writer, user_token):
     await send_message(writer, user_token)
 
     submit_hash_message = await reader.readline()
-    logger.debug(submit_hash_message.decode())
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(submit_hash_message.decode())
 
-    submit_hash_message_payload = json.loads(submit_hash_message)
+    submit_hash_message_payload = orjson.loads(submit_hash_message)
     return submit_hash_message_payload
 
 
+async def _consume_replies(reader):
+    # The server acks every line we send, pings included; the ack itself
+    # is the liveness proof, so just drain the reader and mark the time.
+    while True:
+        if not await reader.readline():
+            raise ConnectionError()
+        LIVENESS.timestamp = time.monotonic()
+
+
+async def _send_user_messages(writer, messages_queue, sending_queue, watchdog_queue):
+    while True:
+        message = await sending_queue.get()
+        outgoing_messages = [message]
+        while True:
+            try:
+                outgoing_messages.append(sending_queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        for message in outgoing_messages:
+            if message == '':
+                continue
+            await messages_queue.put(f'[{_get_timestamp()}] Вы: {message}\n')
+            await send_message(writer, message, flush=False)
+            post_watchdog(watchdog_queue, 'Message sent. User message')
+        await writer.drain()
+
+
 async def handle_message_sending(
     chat_host,
     chat_port,
@@ -69,6 +169,7 @@ async def handle_message_sending(
     sending_queue,
     status_updates_queue,
     watchdog_queue,
+    ping_delay,
 ):
     status_updates_queue.put_nowait(SendingConnectionStateChanged.INITIATED)
     async with create_chat_connection(chat_host, chat_port) as connection:
@@ -76,36 +177,52 @@ async def handle_message_sending(
         status_updates_queue.put_nowait(SendingConnectionStateChanged.ESTABLISHED)
 
         connection_message = await reader.readline()
-        logger.debug(connection_message.decode())
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(connection_message.decode())
 
         if user_token is None:
             login_message = 'Токен не обнаружен, пройдите регистрацию'
             logger.info(login_message)
-            messagebox.showinfo('InvalidToken', login_message)
+            status_updates_queue.put_nowait(ShowError('InvalidToken', login_message))
             raise InvalidToken
 
         submit_hash_message_payload = await authorize_user(reader, writer, user_token)
         if submit_hash_message_payload is None:
             login_message = 'Токен недействителен, пройдите регистрацию заново или проверьте его и перезапустите программу'
             logger.info(login_message)
-            messagebox.showinfo('InvalidToken', login_message)
+            status_updates_queue.put_nowait(ShowError('InvalidToken', login_message))
             raise InvalidToken
 
         username = NicknameReceived(submit_hash_message_payload["nickname"])
         status_updates_queue.put_nowait(username)
         login_message = f'Вы авторизованы как {username.nickname}\n'
-        messages_queue.put_nowait(login_message)
-        watchdog_queue.put_nowait('Authorization done')
+        await messages_queue.put(login_message)
+        post_watchdog(watchdog_queue, 'Authorization done')
         logger.info(login_message)
 
-        while True:
-            message = await sending_queue.get()
-            if message != '':
-                messages_queue.put_nowait(f'[{datetime.now().strftime("%d.%m.%y %H:%M")}] Вы: {message}\n')
-                await handle_chat_reply(reader, watchdog_queue, 'User message')
-            await send_message(writer, message)
-            await handle_chat_reply(reader, watchdog_queue, 'Ping-pong')
-            await sleep(0)
+        loop = asyncio.get_running_loop()
+        ping_handle = None
+
+        def send_ping():
+            # A keepalive is one newline byte written straight into the
+            # transport: no queue round-trip, no encode, no drain — the
+            # user-message path drains for both.
+            nonlocal ping_handle
+            writer.write(b'\n')
+            ping_handle = loop.call_later(ping_delay, send_ping)
+
+        ping_handle = loop.call_later(ping_delay, send_ping)
+        try:
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(_consume_replies(reader))
+                tg.create_task(_send_user_messages(
+                    writer,
+                    messages_queue,
+                    sending_queue,
+                    watchdog_queue,
+                ))
+        finally:
+            ping_handle.cancel()
 
 
 async def read_messages(
@@ -117,25 +234,63 @@ async def read_messages(
     watchdog_queue,
 ):
     status_updates_queue.put_nowait(ReadConnectionStateChanged.INITIATED)
-    async with create_chat_connection(chat_host, chat_port) as connection:
-        reader, writer = connection
+    async with create_raw_connection(chat_host, chat_port) as sock:
+        loop = asyncio.get_running_loop()
         status_updates_queue.put_nowait(ReadConnectionStateChanged.ESTABLISHED)
-        while not reader.at_eof():
-            try:
-                message = await reader.readline()
-                decoded_message = f'[{datetime.now().strftime("%d.%m.%y %H:%M")}] {message.decode()}'
-                messages_queue.put_nowait(decoded_message)
-                save_messages_queue.put_nowait(decoded_message)
-                watchdog_queue.put_nowait('New message in chat')
-                await sleep(0)
-            except asyncio.CancelledError:
-                logger.debug('Closing connection')
-                writer.close()
-                raise
-
-
-async def save_messages(history_path, queue):
-    while True:
-        message = await queue.get()
-        async with aiofiles.open(history_path, mode='a') as file:
-            await file.write(message)
+        # Reuse one receive buffer and split lines in place instead of
+        # paying StreamReader's per-line buffer copy and bytes allocation.
+        buffer = bytearray(65536)
+        view = memoryview(buffer)
+        head = 0
+        fill = 0
+        try:
+            while True:
+                if fill == len(buffer):
+                    # Out of room: reclaim the consumed prefix, or grow if
+                    # one line somehow exceeds the whole buffer.
+                    if head:
+                        buffer[:fill - head] = buffer[head:fill]
+                        fill -= head
+                        head = 0
+                    else:
+                        # Resizing a bytearray with a live memoryview
+                        # export raises BufferError, so drop the view
+                        # first and re-export after the resize.
+                        view.release()
+                        buffer.extend(bytes(len(buffer)))
+                        view = memoryview(buffer)
+                received = await loop.sock_recv_into(sock, view[fill:])
+                if not received:
+                    break
+                fill += received
+                while (newline := buffer.find(b'\n', head, fill)) != -1:
+                    line = buffer[head:newline + 1].decode()
+                    head = newline + 1
+                    decoded_message = f'[{_get_timestamp()}] {line}'
+                    await messages_queue.put(decoded_message)
+                    save_messages_queue.put_nowait(decoded_message)
+                    post_watchdog(watchdog_queue, 'New message in chat')
+                if head == fill:
+                    head = fill = 0
+        except asyncio.CancelledError:
+            logger.debug('Closing connection')
+            raise
+
+
+async def save_messages(history_path, queue, max_batch_size=256):
+    # Open the history file once and keep the descriptor for the life of
+    # the task: each batch costs a single write syscall instead of an
+    # open/write/close round-trip.
+    fd = os.open(history_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+    try:
+        while True:
+            message = await queue.get()
+            batch = [message]
+            while len(batch) < max_batch_size:
+                try:
+                    batch.append(queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            await asyncio.to_thread(os.write, fd, ''.join(batch).encode())
+    finally:
+        os.close(fd)
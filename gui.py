@@ -1,10 +1,12 @@
 import asyncio
+import queue
+import time
 import tkinter as tk
+from dataclasses import dataclass
 from enum import Enum
+from tkinter import messagebox
 from tkinter.scrolledtext import ScrolledText
 
-from anyio import create_task_group
-
 
 class TkAppClosed(Exception):
     pass
@@ -28,14 +30,20 @@ class SendingConnectionStateChanged(Enum):
         return str(self.value)
 
 
+@dataclass(slots=True)
 class NicknameReceived:
-    def __init__(self, nickname):
-        self.nickname = nickname
+    nickname: str
+
 
+@dataclass(slots=True)
+class ShowError:
+    title: str
+    message: str
 
-def process_new_message(input_field, sending_queue):
+
+def process_new_message(input_field, send_message_callback):
     text = input_field.get()
-    sending_queue.put_nowait(text)
+    send_message_callback(text)
     input_field.delete(0, tk.END)
 
 
@@ -49,38 +57,41 @@ async def update_tk(root_frame, interval=1 / 120):
         await asyncio.sleep(interval)
 
 
-async def update_conversation_history(panel, messages_queue):
-    while True:
-        msg = await messages_queue.get()
-
-        panel['state'] = 'normal'
-        if panel.index('end-1c') != '1.0':
-            panel.insert('end', '\n')
-        panel.insert('end', msg)
-        # TODO сделать промотку умной, чтобы не мешала просматривать историю сообщений
-        # ScrolledText.frame
-        # ScrolledText.vbar
-        panel.yview(tk.END)
-        panel['state'] = 'disabled'
+def show_message(panel, msg):
+    panel['state'] = 'normal'
+    if panel.index('end-1c') != '1.0':
+        panel.insert('end', '\n')
+    panel.insert('end', msg)
+    # TODO сделать промотку умной, чтобы не мешала просматривать историю сообщений
+    # ScrolledText.frame
+    # ScrolledText.vbar
+    panel.yview(tk.END)
+    panel['state'] = 'disabled'
 
 
-async def update_status_panel(status_labels, status_updates_queue):
+def apply_status_update(status_labels, msg):
     nickname_label, read_label, write_label = status_labels
 
-    read_label['text'] = f'Чтение: нет соединения'
-    write_label['text'] = f'Отправка: нет соединения'
-    nickname_label['text'] = f'Имя пользователя: неизвестно'
+    if isinstance(msg, ReadConnectionStateChanged):
+        read_label['text'] = f'Чтение: {msg}'
 
-    while True:
-        msg = await status_updates_queue.get()
-        if isinstance(msg, ReadConnectionStateChanged):
-            read_label['text'] = f'Чтение: {msg}'
+    if isinstance(msg, SendingConnectionStateChanged):
+        write_label['text'] = f'Отправка: {msg}'
+
+    if isinstance(msg, NicknameReceived):
+        nickname_label['text'] = f'Имя пользователя: {msg.nickname}'
+
+    if isinstance(msg, ShowError):
+        messagebox.showinfo(msg.title, msg.message)
 
-        if isinstance(msg, SendingConnectionStateChanged):
-            write_label['text'] = f'Отправка: {msg}'
 
-        if isinstance(msg, NicknameReceived):
-            nickname_label['text'] = f'Имя пользователя: {msg.nickname}'
+def _drain_queue(gui_queue, handle_item):
+    while True:
+        try:
+            item = gui_queue.get_nowait()
+        except queue.Empty:
+            return
+        handle_item(item)
 
 
 def create_status_panel(root_frame):
@@ -102,7 +113,13 @@ def create_status_panel(root_frame):
     return (nickname_label, status_read_label, status_write_label)
 
 
-async def draw(messages_queue, sending_queue, status_updates_queue):
+def run(messages_queue, status_updates_queue, send_message_callback, stop_event, interval=1 / 120):
+    """Runs the chat window on the calling (dedicated) thread.
+
+    Both queues are thread-safe queue.SimpleQueue instances fed from the
+    event loop; send_message_callback is invoked on this thread and must
+    hand the text back to the loop itself.
+    """
     root = tk.Tk()
 
     root.title('Чат Майнкрафтера')
@@ -111,6 +128,10 @@ async def draw(messages_queue, sending_queue, status_updates_queue):
     root_frame.pack(fill="both", expand=True)
 
     status_labels = create_status_panel(root_frame)
+    nickname_label, read_label, write_label = status_labels
+    read_label['text'] = 'Чтение: нет соединения'
+    write_label['text'] = 'Отправка: нет соединения'
+    nickname_label['text'] = 'Имя пользователя: неизвестно'
 
     input_frame = tk.Frame(root_frame)
     input_frame.pack(side="bottom", fill=tk.X)
@@ -118,17 +139,28 @@ async def draw(messages_queue, sending_queue, status_updates_queue):
     input_field = tk.Entry(input_frame)
     input_field.pack(side="left", fill=tk.X, expand=True)
 
-    input_field.bind("<Return>", lambda event: process_new_message(input_field, sending_queue))
+    input_field.bind("<Return>", lambda event: process_new_message(input_field, send_message_callback))
 
     send_button = tk.Button(input_frame)
     send_button["text"] = "Отправить"
-    send_button["command"] = lambda: process_new_message(input_field, sending_queue)
+    send_button["command"] = lambda: process_new_message(input_field, send_message_callback)
     send_button.pack(side="left")
 
     conversation_panel = ScrolledText(root_frame, wrap='none')
     conversation_panel.pack(side="top", fill="both", expand=True)
 
-    async with create_task_group() as tg:
-        tg.start_soon(update_tk, root_frame)
-        tg.start_soon(update_conversation_history, conversation_panel, messages_queue)
-        tg.start_soon(update_status_panel, status_labels, status_updates_queue)
+    while not stop_event.is_set():
+        try:
+            root.update()
+        except tk.TclError:
+            # if application has been destroyed/closed
+            raise TkAppClosed()
+        _drain_queue(messages_queue, lambda msg: show_message(conversation_panel, msg))
+        _drain_queue(status_updates_queue, lambda msg: apply_status_update(status_labels, msg))
+        time.sleep(interval)
+
+    # Teardown can set stop_event between ticks; drain once more so
+    # events still in flight — notably ShowError dialogs posted right
+    # before shutdown — are delivered instead of silently dropped.
+    _drain_queue(messages_queue, lambda msg: show_message(conversation_panel, msg))
+    _drain_queue(status_updates_queue, lambda msg: apply_status_update(status_labels, msg))
@@ -1,27 +1,62 @@
-import argparse
 import asyncio
 import logging
+import os
+import queue
 import socket
-from datetime import datetime
+import sys
+import threading
+import time
+from types import SimpleNamespace
 
-from async_timeout import timeout
-from anyio import create_task_group, ExceptionGroup
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 import gui
 from chat_tools import (
     read_messages,
     get_token,
     save_messages,
-    load_chat_history,
     handle_message_sending,
     InvalidToken,
+    LIVENESS,
+    SpscChannel,
+    TaggedQueue,
 )
 
 logger = logging.getLogger(__name__)
 watchdog_logger = logging.getLogger('watchdog')
 
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+logging.getLogger().addHandler(_log_handler)
+logging.getLogger().setLevel(logging.WARNING)
+# The watchdog is the hottest log path: give it its own handler and stop
+# propagation so its records skip the root logger's dispatch.
+watchdog_logger.addHandler(_log_handler)
+watchdog_logger.propagate = False
+
+_READ_CLOSED = gui.ReadConnectionStateChanged.CLOSED
+_SEND_CLOSED = gui.SendingConnectionStateChanged.CLOSED
+
+
+_DEFAULT_ARGUMENTS = SimpleNamespace(
+    logLevel='INFO',
+    history='chat_history.txt',
+    hash='user_hash.txt',
+    host='minechat.dvmn.org',
+    port_write=5050,
+    port_listen=5000,
+    token=None,
+    timeout=10,
+    ping=3,
+)
+
+
+def _build_parser():
+    import argparse
 
-def get_arguments():
     parser = argparse.ArgumentParser(
         prog='GUI Chat',
         description='Client for chat',
@@ -42,19 +77,20 @@ def get_arguments():
     parser.add_argument('--timeout', type=int, default=10, help='connection error timeout')
     parser.add_argument('--ping', type=int, default=3, help='ping delay')
 
-    return parser.parse_args()
+    return parser
 
 
-async def ping_pong(sending_queue, ping_delay):
-    while True:
-        sending_queue.put_nowait('')
-        await asyncio.sleep(ping_delay)
+def get_arguments():
+    # argparse import plus parser construction is startup-heavy; skip it
+    # entirely on the common no-arguments run.
+    if len(sys.argv) == 1:
+        return _DEFAULT_ARGUMENTS
+    return _build_parser().parse_args()
 
 
 async def handle_connection(
     chat_host,
     chat_port_listen,
-    history_path,
     sending_queue,
     chat_port_write,
     user_token,
@@ -65,61 +101,89 @@ async def handle_connection(
     status_updates_queue,
     watchdog_queue,
 ):
+    loop = asyncio.get_running_loop()
+
     while True:
         try:
-            async with create_task_group() as tg:
-                tg.start_soon(
-                    read_messages,
-                    chat_host,
+            # Resolve the host once per attempt and hand the same address
+            # to both connections instead of two getaddrinfo round-trips.
+            addrinfo = await loop.getaddrinfo(
+                chat_host,
+                None,
+                family=socket.AF_INET,
+                type=socket.SOCK_STREAM,
+            )
+            chat_ip = addrinfo[0][4][0]
+            LIVENESS.timestamp = time.monotonic()
+            async with asyncio.TaskGroup() as tg:
+                tg.create_task(read_messages(
+                    chat_ip,
                     chat_port_listen,
                     messages_queue,
                     save_messages_queue,
                     status_updates_queue,
                     watchdog_queue,
-                )
-                tg.start_soon(
-                    save_messages,
-                    history_path,
-                    save_messages_queue,
-                )
-                tg.start_soon(
-                    handle_message_sending,
-                    chat_host,
+                ))
+                tg.create_task(handle_message_sending(
+                    chat_ip,
                     chat_port_write,
                     user_token,
                     messages_queue,
                     sending_queue,
                     status_updates_queue,
                     watchdog_queue,
-                )
-                tg.start_soon(
-                    watch_for_connection,
-                    watchdog_queue,
-                    connection_timeout,
-                )
-                tg.start_soon(
-                    ping_pong,
-                    sending_queue,
                     ping_delay,
-                )
-        except (ExceptionGroup, ConnectionError, socket.gaierror):
-            status_updates_queue.put_nowait(gui.ReadConnectionStateChanged.CLOSED)
-            status_updates_queue.put_nowait(gui.SendingConnectionStateChanged.CLOSED)
+                ))
+                tg.create_task(watch_for_connection(connection_timeout))
+        except* (ConnectionError, socket.gaierror):
+            # except* consumes only the connection errors; anything else
+            # in the group (e.g. InvalidToken) keeps propagating with its
+            # traceback intact instead of feeding the reconnect loop.
+            status_updates_queue.put_nowait(_READ_CLOSED)
+            status_updates_queue.put_nowait(_SEND_CLOSED)
             logger.info('Connection error')
             await asyncio.sleep(3)
 
 
-async def watch_for_connection(watchdog_queue, connection_timeout):
+async def watch_for_connection(connection_timeout):
+    # Pure liveness poller: the event dispatcher bumps LIVENESS for every
+    # watchdog post, so this task wakes at most once per quiet period.
     while True:
-        try:
-            async with timeout(connection_timeout) as cm:
-                message = await watchdog_queue.get()
-                message = f'[{datetime.now().timestamp()}] Connection is alive. {message}'
-                watchdog_logger.info(message)
-        except asyncio.exceptions.TimeoutError:
-            if cm.expired:
-                watchdog_logger.info(f'[{datetime.now().timestamp()}] {connection_timeout}s timeout is elapsed')
-                raise ConnectionError()
+        remaining = LIVENESS.timestamp + connection_timeout - time.monotonic()
+        if remaining <= 0:
+            watchdog_logger.info('[%f] %ss timeout is elapsed', time.time(), connection_timeout)
+            raise ConnectionError()
+        await asyncio.sleep(remaining)
+
+
+async def dispatch_events(event_queue, gui_status_queue):
+    while True:
+        tag, payload = await event_queue.get()
+        if tag == 'status':
+            gui_status_queue.put(payload)
+            continue
+        # Watchdog events are only enqueued when INFO logging is on;
+        # liveness itself is bumped at the posting site.
+        watchdog_logger.info('[%f] Connection is alive. %s', time.time(), payload)
+
+
+async def forward_to_gui(source_queue, gui_queue, max_pending=1_000):
+    while True:
+        message = await source_queue.get()
+        # SimpleQueue is unbounded, so pause past a depth threshold: a
+        # stalled Tk thread (e.g. a modal dialog) then fills the bounded
+        # source queue, which back-pressures the socket read.
+        while gui_queue.qsize() >= max_pending:
+            await asyncio.sleep(0.05)
+        gui_queue.put(message)
+
+
+def _read_history_sync(history_path):
+    fd = os.open(history_path, os.O_RDONLY)
+    try:
+        return os.read(fd, os.fstat(fd).st_size).decode()
+    finally:
+        os.close(fd)
 
 
 async def main():
@@ -134,45 +198,81 @@ async def main():
     connection_timeout = args.timeout
     ping_delay = args.ping
 
-    logging.basicConfig(
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        level=getattr(logging, log_level),
-    )
+    # The root logger stays at WARNING; only our own loggers follow the
+    # requested level, so third-party records keep out of the hot path.
+    for logger_name in ('__main__', 'chat_tools', 'watchdog'):
+        logging.getLogger(logger_name).setLevel(getattr(logging, log_level))
 
-    messages_queue = asyncio.Queue()
+    # Bound the high-traffic queues so a stalled consumer (e.g. a Tk
+    # repaint) back-pressures the socket read instead of growing RSS.
+    messages_queue = asyncio.Queue(maxsize=10_000)
     sending_queue = asyncio.Queue()
-    status_updates_queue = asyncio.Queue()
-    save_messages_queue = asyncio.Queue()
-    watchdog_queue = asyncio.Queue()
-
-    load_chat_history(history_path, messages_queue)
-
-    async with create_task_group() as tg:
-        tg.start_soon(
-            gui.draw,
-            messages_queue,
-            sending_queue,
-            status_updates_queue,
-        )
-        tg.start_soon(
-            handle_connection,
-            chat_host,
-            chat_port_listen,
-            history_path,
-            sending_queue,
-            chat_port_write,
-            user_token,
-            connection_timeout,
-            ping_delay,
-            messages_queue,
-            save_messages_queue,
-            status_updates_queue,
-            watchdog_queue,
-        )
+    save_messages_queue = SpscChannel()
+    # The low-traffic status and watchdog producers share one event
+    # queue (and thus one idle getter future) behind tagged proxies.
+    event_queue = asyncio.Queue()
+    status_updates_queue = TaggedQueue(event_queue, 'status')
+    watchdog_queue = TaggedQueue(event_queue, 'watchdog')
+
+    # Tk runs on its own thread so widget redraws cannot stall the event
+    # loop; it talks to the loop through thread-safe queues.
+    loop = asyncio.get_running_loop()
+    gui_messages_queue = queue.SimpleQueue()
+    gui_status_queue = queue.SimpleQueue()
+    gui_stop_event = threading.Event()
+
+    try:
+        # The preloaded history goes straight onto the GUI thread's queue;
+        # it never needs to transit the asyncio messages queue.
+        gui_messages_queue.put(await asyncio.to_thread(_read_history_sync, history_path))
+        logger.debug('Chat history loaded')
+    except FileNotFoundError:
+        logger.debug('Chat history not found')
+
+    def send_from_gui(message):
+        # Called on the GUI thread.
+        loop.call_soon_threadsafe(sending_queue.put_nowait, message)
+
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tg.create_task(asyncio.to_thread(
+                gui.run,
+                gui_messages_queue,
+                gui_status_queue,
+                send_from_gui,
+                gui_stop_event,
+            ))
+            tg.create_task(forward_to_gui(messages_queue, gui_messages_queue))
+            tg.create_task(dispatch_events(event_queue, gui_status_queue))
+            # The history writer is not connection-bound: keep it in the
+            # persistent outer group so reconnects only recreate the
+            # network tasks.
+            tg.create_task(save_messages(history_path, save_messages_queue))
+            tg.create_task(handle_connection(
+                chat_host,
+                chat_port_listen,
+                sending_queue,
+                chat_port_write,
+                user_token,
+                connection_timeout,
+                ping_delay,
+                messages_queue,
+                save_messages_queue,
+                status_updates_queue,
+                watchdog_queue,
+            ))
+    finally:
+        # Let the GUI thread finish its pump loop so the process can exit.
+        gui_stop_event.set()
 
 
 if __name__ == '__main__':
+    if uvloop is not None:
+        uvloop.install()
     try:
         asyncio.run(main())
     except (InvalidToken, KeyboardInterrupt, gui.TkAppClosed):
         pass
+    except ExceptionGroup as exception_group:
+        if exception_group.split((InvalidToken, gui.TkAppClosed))[1] is not None:
+            raise
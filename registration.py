@@ -1,12 +1,16 @@
-import argparse
 import logging
 import socket
+import sys
 import tkinter as tk
 import asyncio
 from enum import Enum
+from tkinter import messagebox
+from types import SimpleNamespace
 
-import aiofiles
-from anyio import create_task_group
+try:
+    import uvloop
+except ImportError:  # uvloop is not available on Windows
+    uvloop = None
 
 from chat_tools import send_message
 from gui import update_tk, TkAppClosed
@@ -29,7 +33,20 @@ class RegistrationDone(Exception):
     pass
 
 
-def get_arguments():
+_CLOSED = ConnectionStateChanged.CLOSED
+
+
+_DEFAULT_ARGUMENTS = SimpleNamespace(
+    logLevel='INFO',
+    hash='user_hash.txt',
+    host='minechat.dvmn.org',
+    port=5050,
+)
+
+
+def _build_parser():
+    import argparse
+
     parser = argparse.ArgumentParser(
         prog='GUI Chat registration',
         description='Client for chat',
@@ -44,7 +61,15 @@ def get_arguments():
     parser.add_argument('--hash', type=str, default='user_hash.txt', help='user hash path')
     parser.add_argument('--host', type=str, default='minechat.dvmn.org', help='chat host')
     parser.add_argument('--port', type=int, default=5050, help='write chat port')
-    return parser.parse_args()
+    return parser
+
+
+def get_arguments():
+    # argparse import plus parser construction is startup-heavy; skip it
+    # entirely on the common no-arguments run.
+    if len(sys.argv) == 1:
+        return _DEFAULT_ARGUMENTS
+    return _build_parser().parse_args()
 
 
 def create_gui(sending_queue):
@@ -88,6 +113,11 @@ async def update_status_panel(status_label, status_updates_queue):
         status_label['text'] = f'Соединение: {status}'
 
 
+def _write_user_hash_sync(hash_path, user_hash):
+    with open(hash_path, 'w') as file:
+        file.write(user_hash)
+
+
 async def register_user(reader, writer, hash_path, user_name):
 
     if user_name:
@@ -98,13 +128,12 @@ async def register_user(reader, writer, hash_path, user_name):
         await send_message(writer, user_name)
         message = await reader.readline()
         decoded_message = message.decode()
-        logger.info(f'Вы успешно зарегистрированы: {decoded_message}')
-        async with aiofiles.open(hash_path, mode='w') as file:
-            await file.write(decoded_message)
-        tk.messagebox.showinfo('Поздравляем!', 'Вы успешно зарегистрированы')
+        logger.info('Вы успешно зарегистрированы: %s', decoded_message)
+        await asyncio.to_thread(_write_user_hash_sync, hash_path, decoded_message)
+        messagebox.showinfo('Поздравляем!', 'Вы успешно зарегистрированы')
         raise RegistrationDone()
     else:
-        tk.messagebox.showinfo('Ошибка', 'Поле никнейма не может быть пустым')
+        messagebox.showinfo('Ошибка', 'Поле никнейма не может быть пустым')
         await asyncio.sleep(0)
 
 
@@ -122,7 +151,7 @@ async def handle_connection(args, status_updates_queue, sending_queue):
                 await register_user(reader, writer, hash_path, user_name)
 
     except (ConnectionError, socket.gaierror):
-        status_updates_queue.put_nowait(ConnectionStateChanged.CLOSED)
+        status_updates_queue.put_nowait(_CLOSED)
         logger.info('Connection error')
         await asyncio.sleep(3)
 
@@ -140,13 +169,18 @@ async def main():
 
     root, status_label, submit_button, nickname_input = create_gui(sending_queue)
 
-    async with create_task_group() as tg:
-        tg.start_soon(update_tk, root)
-        tg.start_soon(update_status_panel, status_label, status_updates_queue)
-        tg.start_soon(handle_connection, args, status_updates_queue, sending_queue)
+    async with asyncio.TaskGroup() as tg:
+        tg.create_task(update_tk(root))
+        tg.create_task(update_status_panel(status_label, status_updates_queue))
+        tg.create_task(handle_connection(args, status_updates_queue, sending_queue))
 
 if __name__ == '__main__':
+    if uvloop is not None:
+        uvloop.install()
     try:
         asyncio.run(main())
     except (KeyboardInterrupt, TkAppClosed, RegistrationDone):
         pass
+    except ExceptionGroup as exception_group:
+        if exception_group.split((TkAppClosed, RegistrationDone))[1] is not None:
+            raise
@@ -1,4 +1,5 @@
 import asyncio
+import socket
 from contextlib import asynccontextmanager
 
 
@@ -10,3 +11,14 @@ async def create_chat_connection(host, port):
     finally:
         writer.close()
         await writer.wait_closed()
+
+
+@asynccontextmanager
+async def create_raw_connection(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    try:
+        await asyncio.get_running_loop().sock_connect(sock, (host, port))
+        yield sock
+    finally:
+        sock.close()